@@ -1,7 +1,12 @@
 import argparse
 import os
 
-def get_args():
+def get_args(argv=None):
+    """
+    解析命令行参数
+    Args:
+        argv: 参数列表，默认为None即读取 sys.argv[1:]；在脚本中调用时可直接传入，无需修改 sys.argv
+    """
     parser = argparse.ArgumentParser(description='TransE Knowledge Graph Embedding')
     
     # 数据相关参数
@@ -30,10 +35,14 @@ def get_args():
     parser.add_argument('--eval_batch_size', type=int, default=1024, help='评估批次大小')
     parser.add_argument('--filtered_eval', action='store_true', help='是否使用过滤评估')
     parser.add_argument('--hits_at_k', type=int, nargs='+', default=[1, 3, 10], help='Hits@K评估的K值')
+    parser.add_argument('--eval_entity_tile', type=int, default=1024, help='评估时每次打分的候选实体数（分块以限制张量路径的内存峰值，Numba路径无需分块）')
+    parser.add_argument('--eval_amp', action='store_true', help='GPU评估时使用BF16混合精度计算候选得分')
     
     # 系统参数
     parser.add_argument('--seed', type=int, default=42, help='随机种子')
     parser.add_argument('--num_workers', type=int, default=4, help='数据加载器工作进程数')
+    parser.add_argument('--prefetch_factor', type=int, default=4, help='每个数据加载工作进程预取的批次数')
+    parser.add_argument('--prefetch_to_device', action='store_true', help='使用GPU时在独立CUDA流上预取下一批训练数据')
     parser.add_argument('--gpu', type=int, default=0, help='GPU设备ID，-1表示使用CPU')
     parser.add_argument('--save_dir', type=str, default='./results', help='结果保存目录')
     parser.add_argument('--model_name', type=str, default='transe', help='模型名称')
@@ -43,7 +52,7 @@ def get_args():
     parser.add_argument('--eval_interval', type=int, default=1000, help='评估间隔')
     parser.add_argument('--save_interval', type=int, default=5000, help='模型保存间隔')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # 验证参数
     assert 0 < args.train_ratio < 1, "训练集比例必须在(0,1)之间"
@@ -7,12 +7,33 @@
 from flask import Flask, request, jsonify, make_response
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import json
 import os
 import sys
+import time
 import logging
 
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+
+    class ORJSONProvider(DefaultJSONProvider):
+        """使用orjson序列化JSON，jsonify和request.get_json都会经过这里"""
+
+        def dumps(self, obj, **kwargs):
+            # 与默认实现保持一致：键排序，日期等类型交给Flask的default处理
+            return orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            ).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+except ImportError:
+    ORJSONProvider = None  # 未安装orjson时使用Flask默认的json序列化
+
 # 添加recommend目录到路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'recommend'))
 
@@ -25,6 +46,8 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///education_recommendation.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if ORJSONProvider is not None:
+    app.json = ORJSONProvider(app)
 
 # 初始化扩展
 db = SQLAlchemy(app)
@@ -201,6 +224,8 @@ except Exception as e:
 
 # 加载题目数据
 questions_data = {}
+# 知识点ID -> 相关题目列表（保持题库顺序），查询时无需遍历整个题库
+questions_by_knowledge_point = {}
 try:
     questions_path = os.path.join(os.path.dirname(__file__), '..', 'recommend', 'question.json')
     with open(questions_path, 'r', encoding='utf-8') as f:
@@ -208,10 +233,93 @@ try:
         for question in questions_json['questions']:
             questions_data[question['qid']] = question
     
+    for question in questions_data.values():
+        for kp_id in question.get('knowledge_points', {}):
+            questions_by_knowledge_point.setdefault(kp_id, []).append(question)
+    
     logger.info(f"题目数据加载成功，共{len(questions_data)}道题目")
 except Exception as e:
     logger.error(f"题目数据加载失败: {e}")
     questions_data = {}
+    questions_by_knowledge_point = {}
+
+# 加载知识图谱CSV（启动时读取一次，避免每次请求重新读文件）
+# 文件不存在时返回的默认数据
+DEFAULT_KNOWLEDGE_GRAPH_CSV = """4图论,k0,includes,ch14图的基本概念,k1
+4图论,k0,includes,ch15欧拉图&哈密顿图,k2
+4图论,k0,includes,ch16树,k3
+4图论,k0,includes,ch17平面图,k4
+4图论,k0,includes,ch18着色,k5
+ch14图的基本概念,k1,includes,14.1图,k6
+ch14图的基本概念,k1,includes,14.2通路与回路,k7
+ch14图的基本概念,k1,includes,14.3图的连通性,k8
+ch14图的基本概念,k1,includes,14.4图的矩阵表示,k9
+ch14图的基本概念,k1,includes,14.5图的运算,k10
+14.1图,k6,includes,图的定义,k11
+14.1图,k6,includes,多重图与简单图,k12
+14.1图,k6,includes,顶点的度数,k13
+14.1图,k6,includes,图的同构(必要条件),k14
+14.1图,k6,includes,n阶完全图（竞赛图）、k-正则图,k15
+14.1图,k6,includes,子图,k16
+14.1图,k6,includes,补图,k17"""
+
+knowledge_graph_csv = DEFAULT_KNOWLEDGE_GRAPH_CSV
+try:
+    knowledge_graph_path = os.path.join(os.path.dirname(__file__), '..', 'recommend', 'formatted_kg.csv')
+    if os.path.exists(knowledge_graph_path):
+        with open(knowledge_graph_path, 'r', encoding='utf-8') as f:
+            knowledge_graph_csv = f.read()
+except Exception as e:
+    logger.error(f"知识图谱数据加载失败: {e}")
+    knowledge_graph_csv = DEFAULT_KNOWLEDGE_GRAPH_CSV
+
+# 学生答题统计缓存：student_id -> (计算时间, 统计结果)
+# 多个接口在短时间内会重复汇总同一学生的全部答题记录，提交答案时使对应缓存失效
+STUDENT_STATS_TTL = 5.0
+_student_stats_cache = {}
+
+def get_student_answer_stats(student_id):
+    """
+    汇总学生的答题记录
+    Returns:
+        {'knowledge_point_stats': {kp_id: {'total_attempts', 'correct_attempts'}},
+         'total_questions': 答题总数, 'total_correct': 答对总数}
+        结果可能被多个请求共享，调用方不应修改
+    """
+    now = time.monotonic()
+    cached = _student_stats_cache.get(student_id)
+    if cached is not None and now - cached[0] < STUDENT_STATS_TTL:
+        return cached[1]
+    
+    answer_records = AnswerRecord.query.filter_by(student_id=student_id).all()
+    knowledge_point_stats = {}
+    
+    # 统计每个知识点的答题情况
+    for record in answer_records:
+        try:
+            knowledge_points = json.loads(record.knowledge_points)
+        except:
+            continue
+        
+        for kp_id in knowledge_points:
+            if kp_id not in knowledge_point_stats:
+                knowledge_point_stats[kp_id] = {
+                    'total_attempts': 0,
+                    'correct_attempts': 0
+                }
+            
+            stats = knowledge_point_stats[kp_id]
+            stats['total_attempts'] += 1
+            if record.is_correct:
+                stats['correct_attempts'] += 1
+    
+    result = {
+        'knowledge_point_stats': knowledge_point_stats,
+        'total_questions': len(answer_records),
+        'total_correct': sum(1 for record in answer_records if record.is_correct)
+    }
+    _student_stats_cache[student_id] = (now, result)
+    return result
 
 # API路由
 @app.route('/api/health', methods=['GET'])
@@ -520,6 +628,7 @@ def submit_answers(student_id):
             db.session.add(mastery_record)
     
     db.session.commit()
+    _student_stats_cache.pop(student_id, None)
     
     logger.info(f"学生 {student_id} 提交答案，正确率: {sum(1 for a in result['answer_details'] if a['correct']) / len(result['answer_details']):.2%}")
     
@@ -572,61 +681,31 @@ def get_weak_points(student_id):
         
         threshold = request.args.get('threshold', 0.3, type=float)
         
-        # 获取学生的所有答题记录
-        answer_records = AnswerRecord.query.filter_by(student_id=student_id).all()
-        
-        # 统计每个知识点的答题情况
-        knowledge_point_stats = {}
-        
-        for record in answer_records:
-            # 解析知识点信息
-            try:
-                knowledge_points = json.loads(record.knowledge_points)
-            except:
-                continue
-            
-            # 为每个知识点统计答题情况
-            for kp_id in knowledge_points:
-                if kp_id not in knowledge_point_stats:
-                    knowledge_point_stats[kp_id] = {
-                        'total_attempts': 0,
-                        'correct_attempts': 0,
-                        'wrong_attempts': 0,
-                        'accuracy': 0.0
-                    }
-                
-                stats = knowledge_point_stats[kp_id]
-                stats['total_attempts'] += 1
-                
-                if record.is_correct:
-                    stats['correct_attempts'] += 1
-                else:
-                    stats['wrong_attempts'] += 1
-                
-                # 计算正确率
-                stats['accuracy'] = stats['correct_attempts'] / stats['total_attempts'] if stats['total_attempts'] > 0 else 0
+        # 获取学生答题记录的统计（按知识点）
+        answer_stats = get_student_answer_stats(student_id)
         
         # 找出薄弱知识点（正确率低于阈值且有答题记录）
         weak_points = []
-        for kp_id, stats in knowledge_point_stats.items():
-            if stats['accuracy'] < threshold and stats['total_attempts'] > 0:
+        for kp_id, stats in answer_stats['knowledge_point_stats'].items():
+            accuracy = stats['correct_attempts'] / stats['total_attempts'] if stats['total_attempts'] > 0 else 0
+            if accuracy < threshold and stats['total_attempts'] > 0:
                 kp_name = knowledge_points_mapping.get(kp_id, kp_id)
                 weak_points.append({
                     'id': kp_id,
                     'name': kp_name,
                     'total_attempts': stats['total_attempts'],
                     'correct_attempts': stats['correct_attempts'],
-                    'wrong_attempts': stats['wrong_attempts'],
-                    'accuracy': round(stats['accuracy'] * 100, 1),  # 转换为百分比
-                    'score': round(stats['accuracy'], 3)  # 保持小数形式用于排序
+                    'wrong_attempts': stats['total_attempts'] - stats['correct_attempts'],
+                    'accuracy': round(accuracy * 100, 1),  # 转换为百分比
+                    'score': round(accuracy, 3)  # 保持小数形式用于排序
                 })
         
         # 按正确率从低到高排序（最薄弱的在前）
         weak_points.sort(key=lambda x: x['score'])
         
         # 计算总体统计
-        total_questions = len(answer_records)
-        total_correct = sum(1 for record in answer_records if record.is_correct)
+        total_questions = answer_stats['total_questions']
+        total_correct = answer_stats['total_correct']
         overall_accuracy = total_correct / total_questions if total_questions > 0 else 0
         
         result = {
@@ -659,18 +738,17 @@ def get_questions_by_knowledge_point(knowledge_point_id):
     try:
         # 查找包含该知识点的题目
         related_questions = []
-        for qid, question in questions_data.items():
-            if knowledge_point_id in question.get('knowledge_points', {}):
-                # 转换题目格式以匹配前端需求
-                formatted_question = {
-                    'qid': question['qid'],
-                    'content': question['content'],
-                    'options': question['options'],
-                    'answer': question['answer'],
-                    'knowledge_points': question['knowledge_points'],
-                    'difficulty': question['difficulty']
-                }
-                related_questions.append(formatted_question)
+        for question in questions_by_knowledge_point.get(knowledge_point_id, []):
+            # 转换题目格式以匹配前端需求
+            formatted_question = {
+                'qid': question['qid'],
+                'content': question['content'],
+                'options': question['options'],
+                'answer': question['answer'],
+                'knowledge_points': question['knowledge_points'],
+                'difficulty': question['difficulty']
+            }
+            related_questions.append(formatted_question)
         
         # 获取知识点名称
         knowledge_point_name = knowledge_points_mapping.get(knowledge_point_id, knowledge_point_id)
@@ -855,33 +933,12 @@ def get_teacher_all_students():
         
         student_list = []
         for student in students:
-            # 获取学习统计
-            total_questions = AnswerRecord.query.filter_by(student_id=student.id).count()
-            correct_answers = AnswerRecord.query.filter_by(student_id=student.id, is_correct=True).count()
+            # 获取学习统计和知识点掌握情况 - 基于真实答题记录
+            answer_stats = get_student_answer_stats(student.id)
+            total_questions = answer_stats['total_questions']
+            correct_answers = answer_stats['total_correct']
             total_sessions = LearningSession.query.filter_by(student_id=student.id).count()
-            
-            # 获取知识点掌握情况 - 基于真实答题记录
-            answer_records = AnswerRecord.query.filter_by(student_id=student.id).all()
-            knowledge_point_stats = {}
-            
-            # 统计每个知识点的答题情况
-            for record in answer_records:
-                try:
-                    knowledge_points = json.loads(record.knowledge_points)
-                except:
-                    continue
-                
-                for kp_id in knowledge_points:
-                    if kp_id not in knowledge_point_stats:
-                        knowledge_point_stats[kp_id] = {
-                            'total_attempts': 0,
-                            'correct_attempts': 0
-                        }
-                    
-                    stats = knowledge_point_stats[kp_id]
-                    stats['total_attempts'] += 1
-                    if record.is_correct:
-                        stats['correct_attempts'] += 1
+            knowledge_point_stats = answer_stats['knowledge_point_stats']
             
             # 构建知识点得分数据
             knowledge_scores = []
@@ -938,33 +995,12 @@ def get_teacher_student_detail(student_id):
                 'message': f'学生 {student_id} 不存在'
             }), 404
         
-        # 获取学习统计
-        total_questions = AnswerRecord.query.filter_by(student_id=student_id).count()
-        correct_answers = AnswerRecord.query.filter_by(student_id=student_id, is_correct=True).count()
+        # 获取学习统计和知识点掌握详情 - 基于真实答题记录
+        answer_stats = get_student_answer_stats(student_id)
+        total_questions = answer_stats['total_questions']
+        correct_answers = answer_stats['total_correct']
         total_sessions = LearningSession.query.filter_by(student_id=student_id).count()
-        
-        # 获取知识点掌握详情 - 基于真实答题记录
-        answer_records = AnswerRecord.query.filter_by(student_id=student_id).all()
-        knowledge_point_stats = {}
-        
-        # 统计每个知识点的答题情况
-        for record in answer_records:
-            try:
-                knowledge_points = json.loads(record.knowledge_points)
-            except:
-                continue
-            
-            for kp_id in knowledge_points:
-                if kp_id not in knowledge_point_stats:
-                    knowledge_point_stats[kp_id] = {
-                        'total_attempts': 0,
-                        'correct_attempts': 0
-                    }
-                
-                stats = knowledge_point_stats[kp_id]
-                stats['total_attempts'] += 1
-                if record.is_correct:
-                    stats['correct_attempts'] += 1
+        knowledge_point_stats = answer_stats['knowledge_point_stats']
         
         # 构建知识点得分数据
         knowledge_scores = []
@@ -1029,7 +1065,6 @@ def get_teacher_overall_stats():
         average_score = int((correct_answers / total_questions * 100) if total_questions > 0 else 0)
         
         # 活跃学生（最近7天有学习记录）
-        from datetime import datetime, timedelta
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
         active_students = db.session.query(AnswerRecord.student_id).filter(
             AnswerRecord.answered_at >= seven_days_ago
@@ -1101,27 +1136,7 @@ def get_teacher_all_students_mastery():
         students_mastery = []
         for student in students:
             # 获取知识点掌握情况 - 基于真实答题记录
-            answer_records = AnswerRecord.query.filter_by(student_id=student.id).all()
-            knowledge_point_stats = {}
-            
-            # 统计每个知识点的答题情况
-            for record in answer_records:
-                try:
-                    knowledge_points = json.loads(record.knowledge_points)
-                except:
-                    continue
-                
-                for kp_id in knowledge_points:
-                    if kp_id not in knowledge_point_stats:
-                        knowledge_point_stats[kp_id] = {
-                            'total_attempts': 0,
-                            'correct_attempts': 0
-                        }
-                    
-                    stats = knowledge_point_stats[kp_id]
-                    stats['total_attempts'] += 1
-                    if record.is_correct:
-                        stats['correct_attempts'] += 1
+            knowledge_point_stats = get_student_answer_stats(student.id)['knowledge_point_stats']
             
             # 构建知识点得分数据
             knowledge_scores = []
@@ -1445,38 +1460,7 @@ def init_database():
 def get_knowledge_graph():
     """获取知识图谱数据"""
     try:
-        # 读取知识图谱CSV文件
-        csv_file_path = os.path.join(os.path.dirname(__file__), '..', 'recommend', 'formatted_kg.csv')
-        
-        if not os.path.exists(csv_file_path):
-            # 如果文件不存在，返回默认数据
-            default_csv = """4图论,k0,includes,ch14图的基本概念,k1
-4图论,k0,includes,ch15欧拉图&哈密顿图,k2
-4图论,k0,includes,ch16树,k3
-4图论,k0,includes,ch17平面图,k4
-4图论,k0,includes,ch18着色,k5
-ch14图的基本概念,k1,includes,14.1图,k6
-ch14图的基本概念,k1,includes,14.2通路与回路,k7
-ch14图的基本概念,k1,includes,14.3图的连通性,k8
-ch14图的基本概念,k1,includes,14.4图的矩阵表示,k9
-ch14图的基本概念,k1,includes,14.5图的运算,k10
-14.1图,k6,includes,图的定义,k11
-14.1图,k6,includes,多重图与简单图,k12
-14.1图,k6,includes,顶点的度数,k13
-14.1图,k6,includes,图的同构(必要条件),k14
-14.1图,k6,includes,n阶完全图（竞赛图）、k-正则图,k15
-14.1图,k6,includes,子图,k16
-14.1图,k6,includes,补图,k17"""
-            
-            response = make_response(default_csv)
-            response.headers['Content-Type'] = 'text/plain; charset=utf-8'
-            return response
-        
-        # 读取CSV文件内容
-        with open(csv_file_path, 'r', encoding='utf-8') as f:
-            csv_content = f.read()
-        
-        response = make_response(csv_content)
+        response = make_response(knowledge_graph_csv)
         response.headers['Content-Type'] = 'text/plain; charset=utf-8'
         return response
         
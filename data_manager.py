@@ -7,6 +7,12 @@ from collections import defaultdict
 from typing import List, Tuple, Dict, Set
 import random
 
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'  # Arrow的CSV解析器是多线程的
+except ImportError:
+    CSV_ENGINE = 'c'
+
 class TripletDataset(Dataset):
     """知识图谱三元组数据集"""
     
@@ -32,29 +38,30 @@ class TripletDataset(Dataset):
         
         self.entities = list(entity_to_id.keys())
         self.relations = list(relation_to_id.keys())
+        self.num_entities = len(entity_to_id)
     
     def __len__(self):
         return len(self.triplets)
     
+    def _corrupt_entity(self, entity_id: int) -> int:
+        """均匀采样一个不同于 entity_id 的实体ID"""
+        # 在其余 num_entities - 1 个实体中采样，无需拒绝重试
+        neg_id = random.randrange(self.num_entities - 1)
+        return neg_id + 1 if neg_id >= entity_id else neg_id
+    
     def __getitem__(self, idx):
         h, r, t = self.triplets[idx]
         
-        # 生成负样本
+        # 生成负样本（在数据加载工作进程中完成，与训练计算并行）
         negative_triplets = []
         for _ in range(self.negative_samples):
             # 随机选择替换头实体或尾实体
             if random.random() < 0.5:
                 # 替换头实体
-                neg_h = random.choice(self.entities)
-                while neg_h == self.id_to_entity[h]:
-                    neg_h = random.choice(self.entities)
-                neg_triplet = (self.entity_to_id[neg_h], r, t)
+                neg_triplet = (self._corrupt_entity(h), r, t)
             else:
                 # 替换尾实体
-                neg_t = random.choice(self.entities)
-                while neg_t == self.id_to_entity[t]:
-                    neg_t = random.choice(self.entities)
-                neg_triplet = (h, r, self.entity_to_id[neg_t])
+                neg_triplet = (h, r, self._corrupt_entity(t))
             negative_triplets.append(neg_triplet)
         
         return {
@@ -65,9 +72,18 @@ class TripletDataset(Dataset):
 class DataManager:
     """知识图谱数据管理器"""
     
-    def __init__(self, data_path: str, delimiter: str = ',', header: bool = False,
+    def __init__(self, data_path: str = None, delimiter: str = ',', header: bool = False,
                  train_ratio: float = 0.8, valid_ratio: float = 0.1, test_ratio: float = 0.1,
-                 negative_samples: int = 1):
+                 negative_samples: int = 1, triplets=None, entity_names=None, relation_names=None):
+        """
+        Args:
+            data_path: CSV数据文件路径
+            triplets: 内存中的 (head, relation, tail) 三元组，形状为 (N, 3)；
+                      提供时不再读取 data_path，省去写入再解析CSV的往返
+            entity_names: 实体名称列表（下标即实体ID）。与 relation_names 同时提供时，
+                          triplets 视为已编码的整数ID三元组，跳过构建映射
+            relation_names: 关系名称列表（下标即关系ID）
+        """
         self.data_path = data_path
         self.delimiter = delimiter
         self.header = header
@@ -76,10 +92,19 @@ class DataManager:
         self.test_ratio = test_ratio
         self.negative_samples = negative_samples
         
+        if data_path is None and triplets is None:
+            raise ValueError("必须提供 data_path 或 triplets")
+        if (entity_names is None) != (relation_names is None):
+            raise ValueError("entity_names 和 relation_names 必须同时提供")
+        
         # 加载和预处理数据
-        self._load_data()
+        self._load_data(triplets, entity_names, relation_names)
         self._build_datasets()
         
+        # 按ID排列的名称表，批量将ID转换为名称时直接用列表下标
+        self.entity_names = sorted(self.entity_to_id, key=self.entity_to_id.get)
+        self.relation_names = sorted(self.relation_to_id, key=self.relation_to_id.get)
+        
         logging.info(f"数据加载完成:")
         logging.info(f"  实体数量: {self.num_entities}")
         logging.info(f"  关系数量: {self.num_relations}")
@@ -87,41 +112,19 @@ class DataManager:
         logging.info(f"  验证三元组: {len(self.valid_triplets)}")
         logging.info(f"  测试三元组: {len(self.test_triplets)}")
     
-    def _load_data(self):
-        """加载CSV数据文件"""
-        logging.info(f"正在加载数据: {self.data_path}")
-        
-        # 读取CSV文件
-        if self.header:
-            df = pd.read_csv(self.data_path, delimiter=self.delimiter)
+    def _load_data(self, triplets=None, entity_names=None, relation_names=None):
+        """加载三元组数据并划分数据集"""
+        if entity_names is not None:
+            # 已编码的ID三元组：直接使用给定的名称表，无需再扫描字符串
+            logging.info(f"使用已编码的三元组: {len(triplets)} 条")
+            self.entity_to_id = {entity: idx for idx, entity in enumerate(entity_names)}
+            self.relation_to_id = {relation: idx for idx, relation in enumerate(relation_names)}
+            
+            # 去除重复
+            triplets = np.unique(np.asarray(triplets, dtype=np.int64), axis=0)
+            triplets = [tuple(triplet) for triplet in triplets.tolist()]
         else:
-            df = pd.read_csv(self.data_path, delimiter=self.delimiter, header=None)
-            df.columns = ['head', 'relation', 'tail']
-        
-        # 确保列名正确
-        if len(df.columns) != 3:
-            raise ValueError(f"CSV文件必须包含3列: head, relation, tail，当前有{len(df.columns)}列")
-        
-        # 重命名列
-        df.columns = ['head', 'relation', 'tail']
-        
-        # 去除重复和空值
-        df = df.dropna().drop_duplicates()
-        
-        # 构建实体和关系的映射
-        all_entities = set(df['head'].unique()) | set(df['tail'].unique())
-        all_relations = set(df['relation'].unique())
-        
-        self.entity_to_id = {entity: idx for idx, entity in enumerate(sorted(all_entities))}
-        self.relation_to_id = {relation: idx for idx, relation in enumerate(sorted(all_relations))}
-        
-        # 转换为ID三元组
-        triplets = []
-        for _, row in df.iterrows():
-            h_id = self.entity_to_id[row['head']]
-            r_id = self.relation_to_id[row['relation']]
-            t_id = self.entity_to_id[row['tail']]
-            triplets.append((h_id, r_id, t_id))
+            triplets = self._encode_triplets(triplets)
         
         # 随机打乱数据
         random.shuffle(triplets)
@@ -137,6 +140,54 @@ class DataManager:
         
         # 构建所有三元组的集合（用于过滤评估）
         self.all_triplets = set(triplets)
+        
+        # 将三元组打包为单个int64键并排序，过滤评估时可用二分查找向量化判断
+        # 先构建int64数组再零拷贝转换为张量，避免逐个Python整数构造张量
+        triplet_tensor = torch.from_numpy(np.asarray(triplets, dtype=np.int64).reshape(-1, 3))
+        self.all_triplet_keys = self.encode_triplets(
+            triplet_tensor[:, 0], triplet_tensor[:, 1], triplet_tensor[:, 2]
+        ).sort().values
+    
+    def _encode_triplets(self, triplets=None) -> List[Tuple[int, int, int]]:
+        """读取以名称表示的三元组（内存中的三元组或CSV数据文件），构建映射并转换为ID三元组"""
+        if triplets is not None:
+            logging.info(f"使用内存中的三元组: {len(triplets)} 条")
+            df = pd.DataFrame(triplets)
+        else:
+            logging.info(f"正在加载数据: {self.data_path}")
+            
+            # 读取CSV文件（pyarrow引擎仅支持单字符分隔符）
+            engine = CSV_ENGINE if len(self.delimiter) == 1 else 'python'
+            if self.header:
+                df = pd.read_csv(self.data_path, delimiter=self.delimiter, engine=engine)
+            else:
+                df = pd.read_csv(self.data_path, delimiter=self.delimiter, header=None, engine=engine)
+        
+        # 确保列名正确
+        if len(df.columns) != 3:
+            raise ValueError(f"CSV文件必须包含3列: head, relation, tail，当前有{len(df.columns)}列")
+        
+        # 重命名列
+        df.columns = ['head', 'relation', 'tail']
+        
+        # 去除重复和空值
+        df = df.dropna().drop_duplicates()
+        
+        # 构建实体和关系的映射（一次向量化去重，得到排序后的名称表）
+        heads, relations, tails = df['head'].to_numpy(), df['relation'].to_numpy(), df['tail'].to_numpy()
+        all_entities = np.unique(np.concatenate([heads, tails]))
+        all_relations = np.unique(relations)
+        
+        self.entity_to_id = {entity: idx for idx, entity in enumerate(all_entities.tolist())}
+        self.relation_to_id = {relation: idx for idx, relation in enumerate(all_relations.tolist())}
+        
+        # 转换为ID三元组（按排序后的名称表向量化编码，替代逐行iterrows）
+        h_ids = pd.Categorical(heads, categories=all_entities).codes.astype(np.int64)
+        r_ids = pd.Categorical(relations, categories=all_relations).codes.astype(np.int64)
+        t_ids = pd.Categorical(tails, categories=all_entities).codes.astype(np.int64)
+        triplets = list(zip(h_ids.tolist(), r_ids.tolist(), t_ids.tolist()))
+        
+        return triplets
     
     def _build_datasets(self):
         """构建数据集"""
@@ -169,31 +220,32 @@ class DataManager:
     def num_relations(self):
         return len(self.relation_to_id)
     
-    def get_dataloaders(self, batch_size: int, num_workers: int = 4):
-        """获取数据加载器"""
-        train_loader = DataLoader(
-            self.train_dataset,
-            batch_size=batch_size,
-            shuffle=True,
-            num_workers=num_workers,
-            collate_fn=self._collate_fn
-        )
-        
-        valid_loader = DataLoader(
-            self.valid_dataset,
-            batch_size=batch_size,
-            shuffle=False,
-            num_workers=num_workers,
-            collate_fn=self._collate_fn
-        )
+    def encode_triplets(self, h, r, t):
+        """将三元组编码为单个int64键: h * R * E + r * E + t（支持张量广播）"""
+        return (h * self.num_relations + r) * self.num_entities + t
+    
+    def get_dataloaders(self, batch_size: int, num_workers: int = 4, pin_memory: bool = False,
+                        prefetch_factor: int = 2):
+        """
+        获取数据加载器
+        Args:
+            pin_memory: 是否使用锁页内存，配合 non_blocking 拷贝使主机到GPU的传输与计算重叠
+            prefetch_factor: 每个工作进程预取的批次数，仅在 num_workers > 0 时生效
+        """
+        loader_kwargs = {
+            'batch_size': batch_size,
+            'num_workers': num_workers,
+            'pin_memory': pin_memory,
+            # 保持工作进程常驻，避免每个epoch重复创建
+            'persistent_workers': num_workers > 0,
+            'collate_fn': self._collate_fn
+        }
+        if num_workers > 0:
+            loader_kwargs['prefetch_factor'] = prefetch_factor
         
-        test_loader = DataLoader(
-            self.test_dataset,
-            batch_size=batch_size,
-            shuffle=False,
-            num_workers=num_workers,
-            collate_fn=self._collate_fn
-        )
+        train_loader = DataLoader(self.train_dataset, shuffle=True, **loader_kwargs)
+        valid_loader = DataLoader(self.valid_dataset, shuffle=False, **loader_kwargs)
+        test_loader = DataLoader(self.test_dataset, shuffle=False, **loader_kwargs)
         
         return train_loader, valid_loader, test_loader
     
@@ -202,9 +254,9 @@ class DataManager:
         positive_triplets = [item['positive'] for item in batch]
         negative_triplets = [neg for item in batch for neg in item['negative']]
         
-        # 转换为张量
-        positive_tensor = torch.tensor(positive_triplets, dtype=torch.long)
-        negative_tensor = torch.tensor(negative_triplets, dtype=torch.long)
+        # 转换为张量（经由int64数组零拷贝转换）
+        positive_tensor = torch.from_numpy(np.asarray(positive_triplets, dtype=np.int64).reshape(-1, 3))
+        negative_tensor = torch.from_numpy(np.asarray(negative_triplets, dtype=np.int64).reshape(-1, 3))
         
         return {
             'positive': positive_tensor,
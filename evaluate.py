@@ -10,6 +10,12 @@ import time
 from model import TransE
 from data_manager import DataManager
 
+try:
+    from evaluate_numba import rank_batch, triplet_distance
+except ImportError:
+    rank_batch = None
+    triplet_distance = None
+
 class Evaluator:
     """TransE模型评估器"""
     
@@ -20,6 +26,24 @@ class Evaluator:
         
         # 构建所有三元组的集合（用于过滤评估）
         self.all_triplets = data_manager.all_triplets
+        self.all_triplet_keys = data_manager.all_triplet_keys.to(self.device)
+        
+        # 预分配的索引缓冲区，单个三元组查询时复用，避免反复创建张量
+        self._idx_buf = torch.empty(3, dtype=torch.long, device=self.device)
+        
+        # 使用CPU时优先使用Numba编译的排名与打分计算
+        self.use_numba = rank_batch is not None and self.device.type == 'cpu'
+        if self.use_numba:
+            # 过滤评估时内核直接在有序键上二分查找；不过滤时传入空数组
+            self._known_keys = (self.all_triplet_keys.numpy() if args.filtered_eval
+                                else np.empty(0, dtype=np.int64))
+        
+        # 张量路径每次打分的候选实体数，限制得分矩阵的峰值内存；
+        # Numba路径逐个候选计算距离并在内核中过滤，本身不构造得分矩阵
+        self.entity_tile = getattr(args, 'eval_entity_tile', 1024)
+        
+        # 排名只依赖得分的相对顺序，GPU上可使用BF16降低显存带宽
+        self.use_amp = getattr(args, 'eval_amp', False) and self.device.type == 'cuda'
     
     def evaluate(self, model: TransE, dataloader) -> Dict[str, float]:
         """评估模型性能"""
@@ -29,107 +53,107 @@ class Evaluator:
         all_hits_at_k = defaultdict(list)
         
         with torch.no_grad():
+            # 实体嵌入只需取出（并归一化）一次
+            entity_embeddings = model.get_all_entity_embeddings()
+            if self.use_numba:
+                entity_embeddings = entity_embeddings.cpu().numpy()
+            elif self.use_amp:
+                entity_embeddings = entity_embeddings.to(torch.bfloat16)
+            
             for batch in tqdm(dataloader, desc="Evaluating"):
-                positive_triplets = batch['positive']
+                positive_triplets = batch['positive'].to(self.device, non_blocking=True)
+                h, r, t = positive_triplets.unbind(dim=1)
                 
-                for i in range(positive_triplets.size(0)):
-                    h, r, t = positive_triplets[i].tolist()
-                    
+                if self.use_numba:
+                    head_ranks = self._predict_entity_numba(model, entity_embeddings, h, r, t, predict_head=True)
+                    tail_ranks = self._predict_entity_numba(model, entity_embeddings, h, r, t, predict_head=False)
+                else:
                     # 预测头实体
-                    head_ranks, head_hits = self._predict_entity(
-                        model, h, r, t, target_entity=h, predict_head=True
-                    )
+                    head_ranks = self._predict_entity(model, entity_embeddings, h, r, t, predict_head=True)
                     
                     # 预测尾实体
-                    tail_ranks, tail_hits = self._predict_entity(
-                        model, h, r, t, target_entity=t, predict_head=False
-                    )
-                    
-                    # 记录结果
-                    all_ranks.extend([head_ranks, tail_ranks])
-                    
-                    for k in self.args.hits_at_k:
-                        all_hits_at_k[f'hits_at_{k}'].extend([head_hits[k], tail_hits[k]])
+                    tail_ranks = self._predict_entity(model, entity_embeddings, h, r, t, predict_head=False)
+                
+                # 记录结果
+                ranks = torch.cat([head_ranks, tail_ranks])
+                all_ranks.extend(ranks.tolist())
+                
+                for k in self.args.hits_at_k:
+                    all_hits_at_k[f'hits_at_{k}'].extend((ranks <= k).tolist())
         
         # 计算指标
         metrics = self._compute_metrics(all_ranks, all_hits_at_k)
         
         return metrics
     
-    def _predict_entity(self, model: TransE, h: int, r: int, t: int, 
-                       target_entity: int, predict_head: bool = False) -> Tuple[float, Dict[int, bool]]:
-        """预测实体（头实体或尾实体）"""
-        model.eval()
-        
-        # 获取所有候选实体
-        all_entities = list(range(self.data_manager.num_entities))
-        
-        # 计算所有候选的得分
-        scores = []
-        
+    def _predict_entity(self, model: TransE, entity_embeddings: torch.Tensor, h: torch.Tensor,
+                        r: torch.Tensor, t: torch.Tensor, predict_head: bool = False) -> torch.Tensor:
+        """批量预测实体（头实体或尾实体），返回每个三元组目标实体的排名"""
         if predict_head:
             # 预测头实体，固定关系和尾实体
-            for candidate_h in all_entities:
-                score = model.predict(
-                    torch.tensor([candidate_h], device=self.device),
-                    torch.tensor([r], device=self.device),
-                    torch.tensor([t], device=self.device)
-                )
-                scores.append(score.item())
+            queries = model.get_head_query(r, t)
+            target_entity = h
         else:
             # 预测尾实体，固定头实体和关系
-            for candidate_t in all_entities:
-                score = model.predict(
-                    torch.tensor([h], device=self.device),
-                    torch.tensor([r], device=self.device),
-                    torch.tensor([candidate_t], device=self.device)
-                )
-                scores.append(score.item())
-        
-        # 转换为numpy数组
-        scores = np.array(scores)
+            queries = model.get_tail_query(h, r)
+            target_entity = t
         
-        # 过滤评估：移除训练集中的有效三元组
-        if self.args.filtered_eval:
-            scores = self._filter_scores(scores, h, r, t, predict_head)
+        ranks = torch.ones_like(target_entity)
         
-        # 计算排名
-        rank = self._compute_rank(scores, target_entity, predict_head)
-        
-        # 计算Hits@K
-        hits_at_k = {}
-        for k in self.args.hits_at_k:
-            hits_at_k[k] = rank <= k
+        with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16, enabled=self.use_amp):
+            # 目标实体的得分 (batch_size, 1)
+            target_scores = model.score_against_entities(
+                queries, entity_embeddings[target_entity].unsqueeze(1), rank_only=True
+            )
+            
+            # 按块计算候选得分，得分矩阵的峰值显存为 batch_size * entity_tile 而非 batch_size * num_entities
+            for start in range(0, entity_embeddings.size(0), self.entity_tile):
+                tile_embeddings = entity_embeddings[start:start + self.entity_tile]
+                candidates = torch.arange(start, start + tile_embeddings.size(0), device=self.device)
+                scores = model.score_against_entities(queries, tile_embeddings, rank_only=True)
+                
+                # 目标实体自身不参与排名
+                excluded = candidates == target_entity.unsqueeze(1)
+                
+                # 过滤评估：移除训练集中的有效三元组
+                if self.args.filtered_eval:
+                    excluded |= self._known_candidates(h, r, t, predict_head, candidates)
+                
+                # 排名 = 得分大于目标得分的实体数量 + 1
+                scores = scores.masked_fill(excluded, float('-inf'))
+                ranks += (scores > target_scores).sum(dim=1)
         
-        return rank, hits_at_k
+        return ranks
     
-    def _filter_scores(self, scores: np.ndarray, h: int, r: int, t: int, 
-                      predict_head: bool) -> np.ndarray:
-        """过滤评估：将训练集中的有效三元组得分设为负无穷"""
-        filtered_scores = scores.copy()
-        
+    def _predict_entity_numba(self, model: TransE, entity_embeddings: np.ndarray, h: torch.Tensor,
+                              r: torch.Tensor, t: torch.Tensor, predict_head: bool = False) -> torch.Tensor:
+        """使用Numba内核批量预测实体（仅CPU）"""
+        if predict_head:
+            queries = model.get_head_query(r, t)
+        else:
+            queries = model.get_tail_query(h, r)
+        
+        # 过滤在内核中逐个候选查找已知键完成，每个查询只需O(1)额外内存
+        ranks = rank_batch(
+            queries.numpy(), entity_embeddings, h.numpy(), r.numpy(), t.numpy(), predict_head,
+            self._known_keys, self.data_manager.num_relations, model.distance_metric == 'L1'
+        )
+        return torch.from_numpy(ranks)
+    
+    def _known_candidates(self, h: torch.Tensor, r: torch.Tensor, t: torch.Tensor,
+                          predict_head: bool, candidates: torch.Tensor) -> torch.Tensor:
+        """返回 (batch_size, num_candidates) 的布尔掩码，标记候选实体构成的已知有效三元组"""
         if predict_head:
             # 预测头实体时，过滤掉所有有效的(h', r, t)三元组
-            for candidate_h in range(len(scores)):
-                if (candidate_h, r, t) in self.all_triplets:
-                    filtered_scores[candidate_h] = float('-inf')
+            keys = self.data_manager.encode_triplets(candidates, r.unsqueeze(1), t.unsqueeze(1))
         else:
             # 预测尾实体时，过滤掉所有有效的(h, r, t')三元组
-            for candidate_t in range(len(scores)):
-                if (h, r, candidate_t) in self.all_triplets:
-                    filtered_scores[candidate_t] = float('-inf')
-        
-        return filtered_scores
-    
-    def _compute_rank(self, scores: np.ndarray, target_entity: int, predict_head: bool) -> float:
-        """计算目标实体的排名"""
-        # 获取目标实体的得分
-        target_score = scores[target_entity]
-        
-        # 计算排名（得分大于目标得分的实体数量 + 1）
-        rank = np.sum(scores > target_score) + 1
+            keys = self.data_manager.encode_triplets(h.unsqueeze(1), r.unsqueeze(1), candidates)
         
-        return rank
+        # 在有序键数组中二分查找
+        positions = torch.searchsorted(self.all_triplet_keys, keys)
+        positions.clamp_(max=self.all_triplet_keys.numel() - 1)
+        return self.all_triplet_keys[positions] == keys
     
     def _compute_metrics(self, ranks: List[float], hits_at_k: Dict[str, List[bool]]) -> Dict[str, float]:
         """计算评估指标"""
@@ -153,49 +177,66 @@ class Evaluator:
         """评估单个三元组"""
         model.eval()
         
-        with torch.no_grad():
-            # 计算三元组的得分
-            score = model.predict(
-                torch.tensor([h], device=self.device),
-                torch.tensor([r], device=self.device),
-                torch.tensor([t], device=self.device)
+        if self.use_numba:
+            # CPU上直接在嵌入矩阵（零拷贝的numpy视图）上计算，省去张量运算的调度开销
+            distance = triplet_distance(
+                model.entity_embeddings.weight.detach().numpy(),
+                model.relation_embeddings.weight.detach().numpy(),
+                h, r, t, model.distance_metric == 'L1', model.normalize_embeddings
             )
+            return {
+                'score': -distance,
+                'distance': distance
+            }
+        
+        with torch.no_grad():
+            h_ids, r_ids, t_ids = self._fill_index_buffer(h, r, t).view(3, 1)
             
-            # 计算距离
-            h_emb = model.get_entity_embedding(torch.tensor([h], device=self.device))
-            r_emb = model.get_relation_embedding(torch.tensor([r], device=self.device))
-            t_emb = model.get_entity_embedding(torch.tensor([t], device=self.device))
-            
-            if model.distance_metric == 'L1':
-                distance = torch.norm(h_emb + r_emb - t_emb, p=1)
-            else:
-                distance = torch.norm(h_emb + r_emb - t_emb, p=2)
+            # 计算三元组的得分（得分即负距离）
+            score = model.predict(h_ids, r_ids, t_ids)
+            distance = -score
         
         return {
             'score': score.item(),
             'distance': distance.item()
         }
     
+    def score_triplet_np(self, entity_embeddings: np.ndarray, relation_embeddings: np.ndarray,
+                         h: int, r: int, t: int) -> Dict[str, float]:
+        """
+        在预先取出的numpy嵌入上评估单个三元组，不经过张量运算
+        Args:
+            entity_embeddings: C连续的实体嵌入 (num_entities, dim)，需已按模型设置归一化
+            relation_embeddings: C连续的关系嵌入 (num_relations, dim)
+        """
+        use_l1 = self.args.distance_metric == 'L1'
+        if triplet_distance is not None:
+            distance = triplet_distance(entity_embeddings, relation_embeddings, h, r, t, use_l1, False)
+        else:
+            diff = entity_embeddings[h] + relation_embeddings[r] - entity_embeddings[t]
+            distance = float(np.abs(diff).sum() if use_l1 else np.sqrt(np.dot(diff, diff)))
+        
+        return {
+            'score': -distance,
+            'distance': distance
+        }
+    
+    def _fill_index_buffer(self, *ids: int) -> torch.Tensor:
+        """将实体/关系ID写入预分配的索引缓冲区，返回对应的切片"""
+        for i, idx in enumerate(ids):
+            self._idx_buf[i] = idx
+        return self._idx_buf[:len(ids)]
+    
     def get_top_k_predictions(self, model: TransE, h: int, r: int, k: int = 10) -> List[Tuple[int, float]]:
         """获取前K个尾实体预测"""
         model.eval()
         
-        scores = []
-        entities = []
-        
         with torch.no_grad():
-            for t in range(self.data_manager.num_entities):
-                score = model.predict(
-                    torch.tensor([h], device=self.device),
-                    torch.tensor([r], device=self.device),
-                    torch.tensor([t], device=self.device)
-                )
-                scores.append(score.item())
-                entities.append(t)
-        
-        # 排序并返回前K个
-        sorted_indices = np.argsort(scores)[::-1]  # 降序排列
-        top_k = [(entities[i], scores[i]) for i in sorted_indices[:k]]
+            h_id, r_id = self._fill_index_buffer(h, r)
+            scores = model.score_all_tails(h_id, r_id, rank_only=True)
+            top_scores, top_indices = self._top_k(model, scores, k)
+        
+        top_k = list(zip(top_indices.tolist(), top_scores.tolist()))
         
         return top_k
     
@@ -203,25 +244,49 @@ class Evaluator:
         """获取前K个头实体预测"""
         model.eval()
         
-        scores = []
-        entities = []
-        
         with torch.no_grad():
-            for h in range(self.data_manager.num_entities):
-                score = model.predict(
-                    torch.tensor([h], device=self.device),
-                    torch.tensor([r], device=self.device),
-                    torch.tensor([t], device=self.device)
-                )
-                scores.append(score.item())
-                entities.append(h)
-        
-        # 排序并返回前K个
-        sorted_indices = np.argsort(scores)[::-1]  # 降序排列
-        top_k = [(entities[i], scores[i]) for i in sorted_indices[:k]]
+            r_id, t_id = self._fill_index_buffer(r, t)
+            scores = model.score_all_heads(r_id, t_id, rank_only=True)
+            top_scores, top_indices = self._top_k(model, scores, k)
+        
+        top_k = list(zip(top_indices.tolist(), top_scores.tolist()))
         
         return top_k
     
+    def _top_k(self, model: TransE, rank_scores: torch.Tensor, k: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        从 rank_only 得分中取前K个（无需对全部实体排序）
+        L2距离只对选出的K个得分开方，还原为负距离
+        """
+        top_scores, top_indices = torch.topk(rank_scores, min(k, rank_scores.size(-1)), dim=-1)
+        if model.distance_metric == 'L2':
+            top_scores = -(-top_scores).sqrt()
+        return top_scores, top_indices
+    
+    def batched_top_k(self, model: TransE, triplets: List[Tuple[int, int, int]], k: int = 10,
+                      predict_head: bool = False, entity_embeddings=None) -> List[List[Tuple[int, float]]]:
+        """
+        批量获取多个三元组的前K个尾实体（或头实体）预测
+        Args:
+            triplets: (h, r, t) 三元组列表
+            predict_head: True时预测头实体，否则预测尾实体
+            entity_embeddings: 预先取出的实体嵌入，默认使用全部实体嵌入
+        Returns:
+            每个三元组对应一个 [(实体ID, 得分), ...] 列表
+        """
+        model.eval()
+        
+        with torch.no_grad():
+            ids = torch.tensor(triplets, dtype=torch.long, device=self.device).view(-1, 3)
+            # 一次打分所有三元组，整个实体嵌入矩阵只读取一遍
+            if predict_head:
+                scores = model.score_all_heads(ids[:, 1], ids[:, 2], entity_embeddings, rank_only=True)
+            else:
+                scores = model.score_all_tails(ids[:, 0], ids[:, 1], entity_embeddings, rank_only=True)
+            top_scores, top_indices = self._top_k(model, scores, k)
+        
+        return [list(zip(indices, values)) for indices, values in zip(top_indices.tolist(), top_scores.tolist())]
+    
     def print_evaluation_summary(self, metrics: Dict[str, float]):
         """打印评估结果摘要"""
         logging.info("=" * 50)
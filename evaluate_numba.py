@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于Numba的CPU排名与打分计算
+在不使用GPU时替代张量运算，按三元组并行计算目标实体的排名
+"""
+
+import math
+import numpy as np
+from numba import config, njit, prange
+
+# DataLoader会fork工作进程，TBB线程层在此情况下可能导致进程退出时挂起；
+# 未显式指定时改用workqueue（排名内核只在主线程中调用）
+if config.THREADING_LAYER == 'default':
+    config.THREADING_LAYER = 'workqueue'
+
+@njit(cache=True)
+def _distance(query, embedding, use_l1):
+    """计算查询向量与实体嵌入之间的距离（L2距离取平方，不影响排序）"""
+    total = 0.0
+    for d in range(query.shape[0]):
+        diff = query[d] - embedding[d]
+        if use_l1:
+            total += abs(diff)
+        else:
+            total += diff * diff
+    return total
+
+@njit(cache=True)
+def _inverse_norm(vector):
+    """L2范数的倒数，与 F.normalize 一致以1e-12作为范数下限"""
+    total = 0.0
+    for d in range(vector.shape[0]):
+        total += vector[d] * vector[d]
+    return 1.0 / max(math.sqrt(total), 1e-12)
+
+@njit(fastmath=True, cache=True)
+def triplet_distance(entity_embeddings, relation_embeddings, h, r, t, use_l1, normalize):
+    """
+    计算单个三元组的距离 ||h + r - t||
+    Args:
+        entity_embeddings: 实体嵌入矩阵 (num_entities, dim)，未归一化的原始参数
+        relation_embeddings: 关系嵌入矩阵 (num_relations, dim)
+        h, r, t: 头实体、关系、尾实体ID
+        use_l1: 是否使用L1距离，否则使用L2距离
+        normalize: 是否先对头、尾实体嵌入做L2归一化
+    """
+    head = entity_embeddings[h]
+    relation = relation_embeddings[r]
+    tail = entity_embeddings[t]
+    
+    head_scale = 1.0
+    tail_scale = 1.0
+    if normalize:
+        head_scale = _inverse_norm(head)
+        tail_scale = _inverse_norm(tail)
+    
+    total = 0.0
+    for d in range(head.shape[0]):
+        diff = head[d] * head_scale + relation[d] - tail[d] * tail_scale
+        if use_l1:
+            total += abs(diff)
+        else:
+            total += diff * diff
+    return total if use_l1 else math.sqrt(total)
+
+@njit(cache=True)
+def _is_known(known_keys, key):
+    """在有序的三元组键数组中二分查找key"""
+    pos = np.searchsorted(known_keys, key)
+    return pos < known_keys.shape[0] and known_keys[pos] == key
+
+@njit(parallel=True, fastmath=True, cache=True)
+def rank_batch(queries, entity_embeddings, heads, relations, tails, predict_head,
+               known_keys, num_relations, use_l1):
+    """
+    计算一批查询中目标实体的排名
+    Args:
+        queries: 查询向量 (batch_size, dim)，预测尾实体时为 h + r，预测头实体时为 t - r
+        entity_embeddings: 所有实体嵌入 (num_entities, dim)
+        heads, relations, tails: 三元组的头实体、关系、尾实体ID (batch_size,)
+        predict_head: 是否预测头实体，否则预测尾实体
+        known_keys: 需要过滤的已知三元组的有序int64键（编码方式同 DataManager.encode_triplets），
+            不过滤时为空数组
+        num_relations: 关系数量，用于编码三元组键
+        use_l1: 是否使用L1距离，否则使用L2距离
+    Returns:
+        目标实体的排名 (batch_size,)
+    """
+    batch_size = queries.shape[0]
+    num_entities = entity_embeddings.shape[0]
+    filtered = known_keys.shape[0] > 0
+    ranks = np.ones(batch_size, dtype=np.int64)
+    
+    for b in prange(batch_size):
+        h = heads[b]
+        r = relations[b]
+        t = tails[b]
+        target = h if predict_head else t
+        target_distance = _distance(queries[b], entity_embeddings[target], use_l1)
+        
+        # 排名 = 距离小于目标距离的（未过滤）候选数量 + 1
+        better = 0
+        for k in range(num_entities):
+            if k == target:
+                continue
+            if _distance(queries[b], entity_embeddings[k], use_l1) < target_distance:
+                # 过滤评估：只对排在目标之前的候选查找是否为已知三元组，无需构造稠密掩码
+                if filtered:
+                    if predict_head:
+                        key = (k * num_relations + r) * num_entities + t
+                    else:
+                        key = (h * num_relations + r) * num_entities + k
+                    if _is_known(known_keys, key):
+                        continue
+                better += 1
+        ranks[b] += better
+    
+    return ranks
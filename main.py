@@ -32,6 +32,9 @@ def main():
     # 设置随机种子
     set_random_seed(args.seed)
     
+    # 尽早确定设备，模型参数直接在目标设备上创建
+    device = torch.device(f'cuda:{args.gpu}' if args.gpu >= 0 and torch.cuda.is_available() else 'cpu')
+    
     # 设置日志和结果目录
     results_dir, log_file = setup_logging(args.save_dir)
     
@@ -45,12 +48,12 @@ def main():
     save_experiment_config(args, results_dir)
     
     # 检查数据文件是否存在
+    sample_triplets = None
     if not os.path.exists(args.data_path):
         logging.error(f"数据文件不存在: {args.data_path}")
         logging.info("创建示例数据用于测试...")
-        sample_data_path = os.path.join(results_dir, "sample_data.csv")
-        create_sample_data(sample_data_path, num_entities=100, num_relations=10, num_triplets=1000)
-        args.data_path = sample_data_path
+        # 示例三元组直接在内存中交给DataManager，无需写入CSV再解析
+        sample_triplets = create_sample_data(num_entities=100, num_relations=10, num_triplets=1000)
     
     # 初始化数据管理器
     logging.info("初始化数据管理器...")
@@ -61,7 +64,8 @@ def main():
         train_ratio=args.train_ratio,
         valid_ratio=args.valid_ratio,
         test_ratio=args.test_ratio,
-        negative_samples=args.negative_samples
+        negative_samples=args.negative_samples,
+        triplets=sample_triplets
     )
     
     logging.info(f"数据加载完成:")
@@ -79,7 +83,8 @@ def main():
         embedding_dim=args.embedding_dim,
         margin=args.margin,
         distance_metric=args.distance_metric,
-        normalize_embeddings=args.normalize_embeddings
+        normalize_embeddings=args.normalize_embeddings,
+        device=device
     )
     
     logging.info(f"模型参数数量: {count_parameters(model):,}")
@@ -87,7 +92,9 @@ def main():
     # 获取数据加载器
     train_loader, valid_loader, test_loader = data_manager.get_dataloaders(
         batch_size=args.batch_size,
-        num_workers=args.num_workers
+        num_workers=args.num_workers,
+        pin_memory=args.gpu >= 0 and torch.cuda.is_available(),
+        prefetch_factor=args.prefetch_factor
     )
     
     # 初始化训练器
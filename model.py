@@ -11,7 +11,12 @@ class TransE(nn.Module):
     """
     
     def __init__(self, num_entities: int, num_relations: int, embedding_dim: int = 50,
-                 margin: float = 1.0, distance_metric: str = 'L1', normalize_embeddings: bool = True):
+                 margin: float = 1.0, distance_metric: str = 'L1', normalize_embeddings: bool = True,
+                 device=None):
+        """
+        Args:
+            device: 嵌入参数所在设备，直接在该设备上创建和初始化，省去之后整体拷贝到GPU
+        """
         super(TransE, self).__init__()
         
         self.num_entities = num_entities
@@ -22,8 +27,8 @@ class TransE(nn.Module):
         self.normalize_embeddings = normalize_embeddings
         
         # 初始化嵌入层
-        self.entity_embeddings = nn.Embedding(num_entities, embedding_dim)
-        self.relation_embeddings = nn.Embedding(num_relations, embedding_dim)
+        self.entity_embeddings = nn.Embedding(num_entities, embedding_dim, device=device)
+        self.relation_embeddings = nn.Embedding(num_relations, embedding_dim, device=device)
         
         # 初始化参数
         self._init_embeddings()
@@ -107,12 +112,71 @@ class TransE(nn.Module):
         
         distance = self._distance(h_emb, r_emb, t_emb)
         return -distance  # 返回负距离作为得分（距离越小，得分越高）
-    
+
+    def score_all_tails(self, h_ids, r_ids, entity_embeddings=None, rank_only=False):
+        """
+        对所有候选尾实体打分
+        Args:
+            h_ids: 头实体ID，标量张量或形状为 (batch_size,) 的张量
+            r_ids: 关系ID，形状与 h_ids 相同
+            entity_embeddings: 预先取出的候选实体嵌入，默认使用全部实体嵌入
+            rank_only: 仅用于排序时为True，L2距离省略开方
+        Returns:
+            形状为 (..., num_entities) 的得分张量
+        """
+        return self.score_against_entities(self.get_tail_query(h_ids, r_ids), entity_embeddings, rank_only)
+
+    def score_all_heads(self, r_ids, t_ids, entity_embeddings=None, rank_only=False):
+        """
+        对所有候选头实体打分
+        Args:
+            r_ids: 关系ID，标量张量或形状为 (batch_size,) 的张量
+            t_ids: 尾实体ID，形状与 r_ids 相同
+            entity_embeddings: 预先取出的候选实体嵌入，默认使用全部实体嵌入
+            rank_only: 仅用于排序时为True，L2距离省略开方
+        Returns:
+            形状为 (..., num_entities) 的得分张量
+        """
+        return self.score_against_entities(self.get_head_query(r_ids, t_ids), entity_embeddings, rank_only)
+
+    def get_tail_query(self, h_ids, r_ids):
+        """获取预测尾实体时的查询向量 h + r"""
+        return self.get_entity_embedding(h_ids) + self.relation_embeddings(r_ids)
+
+    def get_head_query(self, r_ids, t_ids):
+        """获取预测头实体时的查询向量 t - r"""
+        # h + r ≈ t  =>  h ≈ t - r，因此 ||h + r - t|| = ||h - (t - r)||
+        return self.get_entity_embedding(t_ids) - self.relation_embeddings(r_ids)
+
+    def score_against_entities(self, query, entity_embeddings=None, rank_only=False):
+        """
+        计算查询向量与候选实体嵌入之间的负距离
+        rank_only为True时L2返回负的平方距离：开方是单调的，不改变排序
+        """
+        if entity_embeddings is None:
+            entity_embeddings = self.get_all_entity_embeddings()
+        # 查询向量跟随候选嵌入的精度（如评估时使用的BF16）
+        query = query.to(entity_embeddings.dtype)
+        
+        if self.distance_metric == 'L1':
+            distance = (query.unsqueeze(-2) - entity_embeddings).abs().sum(dim=-1)
+        elif self.distance_metric == 'L2':
+            # ||q - e||^2 = ||q||^2 - 2 q·e + ||e||^2，用一次矩阵乘法代替逐元素广播相减
+            inner = torch.matmul(query.unsqueeze(-2), entity_embeddings.transpose(-1, -2)).squeeze(-2)
+            sq_distance = (query * query).sum(dim=-1, keepdim=True) - 2 * inner \
+                + (entity_embeddings * entity_embeddings).sum(dim=-1)
+            distance = sq_distance.clamp_min(0)
+            if not rank_only:
+                distance = distance.sqrt()
+        else:
+            raise ValueError(f"不支持的距离度量: {self.distance_metric}")
+        return -distance
+
     def get_entity_embedding(self, entity_ids):
         """获取实体嵌入"""
         embeddings = self.entity_embeddings(entity_ids)
         if self.normalize_embeddings:
-            embeddings = F.normalize(embeddings, p=2, dim=1)
+            embeddings = F.normalize(embeddings, p=2, dim=-1)
         return embeddings
     
     def get_relation_embedding(self, relation_ids):
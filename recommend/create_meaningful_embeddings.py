@@ -13,36 +13,55 @@ from sklearn.decomposition import PCA
 from collections import defaultdict
 import pandas as pd
 
+# 边权重根据关系类型设置（权重越低，嵌入空间中的目标距离越近）
+RELATION_WEIGHTS = {
+    "is_prerequisite_for": 1.0,  # 前置关系权重较低（距离较近）
+    "is_related_to": 1.5,  # 相关关系权重稍高
+}
+DEFAULT_RELATION_WEIGHT = 2.0
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
 def load_knowledge_graph(csv_path):
     """加载知识图谱"""
     G = nx.DiGraph()
-    kp_names = {}
-    
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            kp1_id = row['kp1_id']
-            kp2_id = row['kp2_id']
-            kp1_name = row['kp1_name']
-            kp2_name = row['kp2_name']
-            relation = row['relation']
-            
-            # 记录知识点名称
-            kp_names[kp1_id] = kp1_name
-            kp_names[kp2_id] = kp2_name
-            
-            # 添加边，权重根据关系类型设置
-            if relation == "is_prerequisite_for":
-                weight = 1.0  # 前置关系权重较低（距离较近）
-            elif relation == "is_related_to":
-                weight = 1.5  # 相关关系权重稍高
-            else:
-                weight = 2.0
-            
-            G.add_edge(kp1_id, kp2_id, weight=weight, relation=relation)
-            # 对于相关关系，添加双向边
-            if relation == "is_related_to":
-                G.add_edge(kp2_id, kp1_id, weight=weight, relation=relation)
+    
+    # 按列整体读取，避免逐行构造字典；Parquet为列式存储，可跳过文本解析
+    if str(csv_path).endswith(PARQUET_SUFFIXES):
+        df = pd.read_parquet(csv_path).fillna('').astype(str)
+    else:
+        df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    # 关系类型种类很少，转为分类类型后映射权重和比较只需作用于类别和整数编码
+    relation_col = df['relation'].astype('category')
+    kp1_ids = df['kp1_id'].to_numpy()
+    kp2_ids = df['kp2_id'].to_numpy()
+    relations = relation_col.to_numpy()
+    weights = relation_col.map(RELATION_WEIGHTS).astype(float).fillna(DEFAULT_RELATION_WEIGHT).to_numpy()
+    
+    # 记录知识点名称（按行内先kp1后kp2的顺序，后出现的名称覆盖先出现的）
+    kp_names = dict(zip(
+        np.column_stack([kp1_ids, kp2_ids]).ravel().tolist(),
+        np.column_stack([df['kp1_name'].to_numpy(), df['kp2_name'].to_numpy()]).ravel().tolist()
+    ))
+    
+    # 对于相关关系，添加双向边；反向边紧跟在对应的正向边之后，
+    # 保持与逐行添加时相同的节点顺序和属性覆盖顺序
+    related = (relation_col == "is_related_to").to_numpy()
+    order = np.argsort(np.concatenate([
+        np.arange(len(df)) * 2,
+        np.flatnonzero(related) * 2 + 1
+    ]), kind='stable')
+    sources = np.concatenate([kp1_ids, kp2_ids[related]])[order]
+    targets = np.concatenate([kp2_ids, kp1_ids[related]])[order]
+    edge_weights = np.concatenate([weights, weights[related]])[order]
+    edge_relations = np.concatenate([relations, relations[related]])[order]
+    
+    G.add_edges_from(
+        (kp1_id, kp2_id, {'weight': weight, 'relation': relation})
+        for kp1_id, kp2_id, weight, relation in zip(
+            sources.tolist(), targets.tolist(), edge_weights.tolist(), edge_relations.tolist()
+        )
+    )
     
     return G, kp_names
 
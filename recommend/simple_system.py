@@ -7,10 +7,17 @@
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import json
+import heapq
 import pandas as pd
 import time
 from typing import Dict, List, Tuple, Optional
 
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'  # Arrow的CSV解析器是多线程的
+except ImportError:
+    CSV_ENGINE = 'c'
+
 class StudentModel:
     """学生模型类"""
     
@@ -216,17 +223,17 @@ class RecommendationSystem:
     
     def _load_embeddings(self, path: str) -> Dict[str, np.ndarray]:
         """加载知识点嵌入向量"""
-        df = pd.read_csv(path)
-        embeddings = {}
-        for _, row in df.iterrows():
-            kp_id = row['kp_id']
-            vector = row.iloc[1:].values.astype(float)
-            embeddings[kp_id] = vector
-        return embeddings
+        df = pd.read_csv(path, engine=CSV_ENGINE)
+        # 整体取出嵌入矩阵，每个知识点对应其中一行，避免逐行构造Series
+        vectors = df.iloc[:, 1:].to_numpy(dtype=float)
+        return dict(zip(df['kp_id'].tolist(), vectors))
     
     def _load_knowledge_graph(self, path: str) -> pd.DataFrame:
-        """加载知识图谱"""
-        return pd.read_csv(path)
+        """加载知识图谱（支持CSV和Parquet）"""
+        if path.endswith(('.parquet', '.pq')):
+            # Parquet为列式存储，直接按列读取，无需解析文本
+            return pd.read_parquet(path)
+        return pd.read_csv(path, engine=CSV_ENGINE)
     
     def _load_questions(self, path: str) -> List[Dict]:
         """加载题库"""
@@ -236,7 +243,7 @@ class RecommendationSystem:
 
     def _load_node_names(self, path: str) -> Dict[str, str]:
         """加载节点名称映射"""
-        df = pd.read_csv(path)
+        df = pd.read_csv(path, engine=CSV_ENGINE)
         # print(df.head())  # 打印列名以确认
         return pd.Series(df['id'].values, index=df['name']).to_dict()  # 修改为实际列名
 
@@ -732,23 +739,29 @@ class RecommendationSystem:
             vector_based_candidates = []
             
             # 从多个已掌握知识点出发进行拓展
-            top_mastered = sorted(mastered_points, 
-                                key=lambda kp: student.get_mastery_level(kp), 
-                                reverse=True)[:3]
+            top_mastered = heapq.nlargest(3, mastered_points,
+                                          key=lambda kp: student.get_mastery_level(kp))
+            
+            # 未掌握的知识点只需筛选一次
+            unmastered_kps = [kp_id for kp_id in self.embeddings
+                              if student.get_mastery_level(kp_id) < 0.5]
             
+            target_sources = []
+            target_vectors = []
             for mastered_kp in top_mastered:
                 # 使用多种关系向量进行探索
                 for relation_type in ["prerequisite", "similarity", "advanced"]:
                     relation_vector = self._get_enhanced_relation_vector(relation_type)
-                    V_mastered = self.embeddings[mastered_kp]
-                    V_target = V_mastered + relation_vector
-                    
-                    # 寻找未掌握的相关知识点
-                    for kp_id, kp_embedding in self.embeddings.items():
-                        if student.get_mastery_level(kp_id) < 0.5:
-                            similarity = cosine_similarity([V_target], [kp_embedding])[0][0]
-                            if similarity > 0.3:
-                                vector_based_candidates.append((kp_id, similarity, mastered_kp, relation_type))
+                    target_sources.append((mastered_kp, relation_type))
+                    target_vectors.append(self.embeddings[mastered_kp] + relation_vector)
+            
+            # 寻找未掌握的相关知识点：一次矩阵运算算出所有目标向量与候选的相似度
+            if unmastered_kps and target_vectors:
+                similarities = cosine_similarity(
+                    target_vectors, [self.embeddings[kp_id] for kp_id in unmastered_kps])
+                for (mastered_kp, relation_type), row in zip(target_sources, similarities):
+                    for idx in np.flatnonzero(row > 0.3):
+                        vector_based_candidates.append((unmastered_kps[idx], row[idx], mastered_kp, relation_type))
             
             # 去重并排序
             unique_vector_candidates = {}
@@ -756,13 +769,11 @@ class RecommendationSystem:
                 if kp_id not in unique_vector_candidates or unique_vector_candidates[kp_id][0] < score:
                     unique_vector_candidates[kp_id] = (score, source_kp, relation_type)
             
-            vector_sorted = sorted(unique_vector_candidates.keys(), 
-                              key=lambda kp: unique_vector_candidates[kp][0], 
-                              reverse=True)
-            
-            # 补充到目标知识点列表
+            # 补充到目标知识点列表，只需取前remaining_slots个，无需全量排序
             remaining_slots = 3 - len(target_kps)
-            target_kps.extend([kp for kp in vector_sorted[:remaining_slots] if kp not in target_kps])
+            vector_top = heapq.nlargest(remaining_slots, unique_vector_candidates.keys(),
+                                        key=lambda kp: unique_vector_candidates[kp][0])
+            target_kps.extend([kp for kp in vector_top if kp not in target_kps])
         
         return self._recommend_by_target_kps(student, target_kps, num_questions,
                                            strategy_name="expansion")
@@ -936,12 +947,9 @@ class RecommendationSystem:
             
             scored_questions.append((question, final_score, strategy_name))
         
-        # 排序并返回前N个
-        scored_questions.sort(key=lambda x: x[1], reverse=True)
-        
-        # 确保不超过请求数量
+        # 取得分最高的前N个（确保不超过请求数量）
         final_questions = []
-        for q, score, strategy in scored_questions[:num_questions]:
+        for q, score, strategy in heapq.nlargest(num_questions, scored_questions, key=lambda x: x[1]):
             # 记录推荐策略信息
             q_copy = q.copy()
             q_copy['recommendation_strategy'] = strategy
@@ -5,8 +5,7 @@ TransE 快速测试脚本
 验证项目的基本功能是否正常工作
 """
 
-import os
-import sys
+from pathlib import Path
 import torch
 import numpy as np
 import pandas as pd
@@ -63,14 +62,13 @@ def test_data_manager():
         print(f"  ✓ 数据加载器创建成功")
         
         # 清理临时文件
-        os.remove(test_file)
+        Path(test_file).unlink()
         
         return data_manager
         
     except Exception as e:
         print(f"  ✗ 数据管理器测试失败: {e}")
-        if os.path.exists(test_file):
-            os.remove(test_file)
+        Path(test_file).unlink(missing_ok=True)
         return None
 
 def test_model():
@@ -104,7 +102,17 @@ def test_model():
             torch.tensor([1])
         )
         print(f"  ✓ 预测功能正常，得分: {scores.item():.4f}")
-        
+
+        # 测试批量打分与逐个预测一致
+        all_ids = torch.arange(10)
+        tail_scores = model.score_all_tails(torch.tensor(0), torch.tensor(0))
+        head_scores = model.score_all_heads(torch.tensor(0), torch.tensor(1))
+        expected_tail = model.predict(torch.zeros(10, dtype=torch.long), torch.zeros(10, dtype=torch.long), all_ids)
+        expected_head = model.predict(all_ids, torch.zeros(10, dtype=torch.long), torch.ones(10, dtype=torch.long))
+        assert torch.allclose(tail_scores, expected_tail, atol=1e-5)
+        assert torch.allclose(head_scores, expected_head, atol=1e-5)
+        print(f"  ✓ 批量打分与逐个预测一致")
+
         return model
         
     except Exception as e:
@@ -120,8 +128,7 @@ def test_training():
     
     try:
         # 设置参数
-        sys.argv = [
-            'test_quick.py',
+        args = get_args([
             '--data_path', test_file,
             '--embedding_dim', '10',
             '--margin', '1.0',
@@ -130,9 +137,7 @@ def test_training():
             '--batch_size', '2',
             '--epochs', '5',
             '--gpu', '-1'
-        ]
-        
-        args = get_args()
+        ])
         set_random_seed(args.seed)
         
         # 初始化数据管理器
@@ -171,14 +176,13 @@ def test_training():
         print(f"  ✓ 验证成功，损失: {valid_metrics['loss']:.4f}")
         
         # 清理临时文件
-        os.remove(test_file)
+        Path(test_file).unlink()
         
         return True
         
     except Exception as e:
         print(f"  ✗ 训练测试失败: {e}")
-        if os.path.exists(test_file):
-            os.remove(test_file)
+        Path(test_file).unlink(missing_ok=True)
         return False
 
 def test_evaluation():
@@ -190,8 +194,7 @@ def test_evaluation():
     
     try:
         # 设置参数
-        sys.argv = [
-            'test_quick.py',
+        args = get_args([
             '--data_path', test_file,
             '--embedding_dim', '10',
             '--margin', '1.0',
@@ -200,9 +203,7 @@ def test_evaluation():
             '--batch_size', '2',
             '--epochs', '5',
             '--gpu', '-1'
-        ]
-        
-        args = get_args()
+        ])
         set_random_seed(args.seed)
         
         # 初始化数据管理器
@@ -242,14 +243,13 @@ def test_evaluation():
         print(f"  ✓ 获取前K预测成功，预测数量: {len(top_predictions)}")
         
         # 清理临时文件
-        os.remove(test_file)
+        Path(test_file).unlink()
         
         return True
         
     except Exception as e:
         print(f"  ✗ 评估测试失败: {e}")
-        if os.path.exists(test_file):
-            os.remove(test_file)
+        Path(test_file).unlink(missing_ok=True)
         return False
 
 def main():
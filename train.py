@@ -43,6 +43,11 @@ class Trainer:
         # 初始化评估器
         self.evaluator = Evaluator(data_manager, args)
         
+        # 将下一批数据提前拷贝到GPU的CUDA流（为None时不预取）
+        self.prefetch_stream = None
+        if getattr(args, 'prefetch_to_device', False):
+            self.enable_prefetch()
+        
         # 训练状态
         self.best_valid_score = float('inf')
         self.patience_counter = 0
@@ -53,6 +58,42 @@ class Trainer:
             'valid_hits_at_10': []
         }
     
+    def enable_prefetch(self):
+        """启用GPU预取：在独立CUDA流上拷贝下一批数据，与当前批次的计算重叠"""
+        if self.device.type != 'cuda':
+            logging.info("未使用GPU，跳过数据预取")
+            return
+        self.prefetch_stream = torch.cuda.Stream(device=self.device)
+    
+    def _to_device(self, batch):
+        """将一批数据异步拷贝到设备上"""
+        return {key: value.to(self.device, non_blocking=True) for key, value in batch.items()}
+    
+    def _device_batches(self, loader):
+        """逐批返回已在设备上的数据；启用预取时提前一个批次发起拷贝"""
+        if self.prefetch_stream is None:
+            for batch in loader:
+                yield self._to_device(batch)
+            return
+        
+        pending = None
+        for batch in loader:
+            with torch.cuda.stream(self.prefetch_stream):
+                next_batch = self._to_device(batch)
+            if pending is not None:
+                yield self._wait_for_prefetch(pending)
+            pending = next_batch
+        if pending is not None:
+            yield self._wait_for_prefetch(pending)
+    
+    def _wait_for_prefetch(self, batch):
+        """等待预取流上的拷贝完成，并将张量登记到当前流，避免显存被提前复用"""
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_stream(self.prefetch_stream)
+        for value in batch.values():
+            value.record_stream(current_stream)
+        return batch
+    
     def train_epoch(self, train_loader: DataLoader) -> float:
         """训练一个epoch"""
         self.model.train()
@@ -61,10 +102,10 @@ class Trainer:
         
         progress_bar = tqdm(train_loader, desc="Training")
         
-        for batch_idx, batch in enumerate(progress_bar):
-            # 将数据移到设备上
-            positive_triplets = batch['positive'].to(self.device)
-            negative_triplets = batch['negative'].to(self.device)
+        for batch_idx, batch in enumerate(self._device_batches(progress_bar)):
+            # 数据已在设备上
+            positive_triplets = batch['positive']
+            negative_triplets = batch['negative']
             
             # 前向传播
             loss = self.model(positive_triplets, negative_triplets)
@@ -102,8 +143,8 @@ class Trainer:
         
         with torch.no_grad():
             for batch in tqdm(valid_loader, desc="Validating"):
-                positive_triplets = batch['positive'].to(self.device)
-                negative_triplets = batch['negative'].to(self.device)
+                positive_triplets = batch['positive'].to(self.device, non_blocking=True)
+                negative_triplets = batch['negative'].to(self.device, non_blocking=True)
                 
                 loss = self.model(positive_triplets, negative_triplets)
                 total_loss += loss.item()
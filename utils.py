@@ -9,7 +9,10 @@ from typing import Dict, List, Any
 import random
 
 def setup_logging(save_dir: str) -> tuple:
-    """设置日志记录"""
+    """
+    设置日志记录
+    日志级别默认为INFO，可通过环境变量 TRANSE_LOG_LEVEL（如 WARNING）调整，无需修改代码
+    """
     # 创建保存目录（不使用时间戳）
     results_dir = save_dir
     os.makedirs(results_dir, exist_ok=True)
@@ -24,20 +27,25 @@ def setup_logging(save_dir: str) -> tuple:
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
     
-    # 设置日志级别
-    logger.setLevel(logging.INFO)
+    # 设置日志级别，无法识别的级别名回退到INFO（处理器创建后再给出警告）
+    level_name = os.environ.get('TRANSE_LOG_LEVEL', 'INFO').upper()
+    log_level = getattr(logging, level_name, None)
+    invalid_level = not isinstance(log_level, int)
+    if invalid_level:
+        log_level = logging.INFO
+    logger.setLevel(log_level)
     
     # 创建格式化器
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     
     # 创建文件处理器
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
+    file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
     
     # 创建控制台处理器
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
     
     # 添加处理器到根日志记录器
@@ -49,6 +57,9 @@ def setup_logging(save_dir: str) -> tuple:
     logging.getLogger('torch').setLevel(logging.WARNING)
     logging.getLogger('numpy').setLevel(logging.WARNING)
     
+    if invalid_level:
+        logging.warning(f"无法识别的日志级别 TRANSE_LOG_LEVEL={level_name}，已使用INFO")
+    
     logging.info(f"日志文件: {log_file}")
     logging.info(f"结果目录: {results_dir}")
     
@@ -144,15 +155,20 @@ def plot_training_curves(training_history: Dict[str, List[float]], save_dir: str
     
     logging.info(f"训练曲线已保存到: {plot_file}")
 
-def save_embeddings(model, data_manager, save_dir: str):
-    """保存实体和关系嵌入"""
+def save_embeddings(model, data_manager, save_dir: str, dtype=np.float32):
+    """
+    保存实体和关系嵌入
+    Args:
+        dtype: 保存的数值类型；使用 np.float16 时文件大小减半，
+               会损失约3位有效数字的精度（.npy文件头中记录了类型和形状）
+    """
     # 保存实体嵌入
-    entity_embeddings = model.get_all_entity_embeddings().detach().cpu().numpy()
+    entity_embeddings = model.get_all_entity_embeddings().detach().cpu().numpy().astype(dtype, copy=False)
     entity_file = os.path.join(save_dir, "entity_embeddings.npy")
     np.save(entity_file, entity_embeddings)
     
     # 保存关系嵌入
-    relation_embeddings = model.get_all_relation_embeddings().detach().cpu().numpy()
+    relation_embeddings = model.get_all_relation_embeddings().detach().cpu().numpy().astype(dtype, copy=False)
     relation_file = os.path.join(save_dir, "relation_embeddings.npy")
     np.save(relation_file, relation_embeddings)
     
@@ -195,6 +211,16 @@ def count_parameters(model) -> int:
     """计算模型参数数量"""
     return sum(p.numel() for p in model.parameters())
 
+def suggest_num_workers(num_samples: int, small_dataset_threshold: int = 10000, max_workers: int = 8) -> int:
+    """
+    根据数据规模推荐数据加载器工作进程数
+    小数据集上多进程加载的进程创建与进程间通信开销大于收益，直接在主进程中加载；
+    数据集较大时按CPU核数扩展，上限为 max_workers
+    """
+    if num_samples < small_dataset_threshold:
+        return 0
+    return min(max_workers, os.cpu_count() or 1)
+
 def format_time(seconds: float) -> str:
     """格式化时间"""
     if seconds < 60:
@@ -209,8 +235,14 @@ def format_time(seconds: float) -> str:
         seconds = seconds % 60
         return f"{int(hours)}h {int(minutes)}m {seconds:.2f}s"
 
-def create_sample_data(save_path: str, num_entities: int = 100, num_relations: int = 10, num_triplets: int = 1000):
-    """创建示例数据用于测试"""
+def create_sample_data(save_path: str = None, num_entities: int = 100, num_relations: int = 10, num_triplets: int = 1000):
+    """
+    创建示例数据用于测试
+    Args:
+        save_path: CSV保存路径，为None时不写入磁盘
+    Returns:
+        (head, relation, tail) 三元组列表，可直接交给 DataManager(triplets=...)
+    """
     import pandas as pd
     
     # 生成实体和关系
@@ -228,19 +260,23 @@ def create_sample_data(save_path: str, num_entities: int = 100, num_relations: i
     # 去除重复
     triplets = list(set(map(tuple, triplets)))
     
-    # 保存为CSV
     df = pd.DataFrame(triplets, columns=['head', 'relation', 'tail'])
-    df.to_csv(save_path, index=False, header=False)
-    
-    logging.info(f"示例数据已创建: {save_path}")
-    logging.info(f"  实体数量: {len(set(df['head'].unique()) | set(df['tail'].unique()))}")
-    logging.info(f"  关系数量: {len(df['relation'].unique())}")
+    if save_path is not None:
+        # 保存为CSV
+        df.to_csv(save_path, index=False, header=False)
+        logging.info(f"示例数据已创建: {save_path}")
+    else:
+        logging.info("示例数据已创建")
+    logging.info(f"  实体数量: {pd.unique(np.concatenate([df['head'].to_numpy(), df['tail'].to_numpy()])).size}")
+    logging.info(f"  关系数量: {pd.unique(df['relation'].to_numpy()).size}")
     logging.info(f"  三元组数量: {len(df)}")
+    
+    return triplets
 
 def load_embeddings(embedding_file: str, mapping_file: str):
     """加载保存的嵌入"""
-    # 加载嵌入
-    embeddings = np.load(embedding_file)
+    # 加载嵌入（以半精度保存的嵌入转换回float32再参与计算）
+    embeddings = np.load(embedding_file).astype(np.float32, copy=False)
     
     # 加载映射
     with open(mapping_file, 'r', encoding='utf-8') as f: